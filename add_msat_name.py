@@ -16,15 +16,33 @@ Name format:
     n     = ascending index among loci that have the same <motif>(R1-R2)
 
 Join key and robustness:
-  - Locus number is extracted from the primer 'id' using regex: the leading integer (e.g., "66" from "66.1" or "66.1.2").
+  - Locus number is extracted from the primer 'id' as its leading integer (e.g., "66" from "66.1" or "66.1.2").
   - .compare is keyed by 'number'.
+  - Any input/output path ending in .gz or .zst is (de)compressed on the fly (.zst needs 'zstandard').
 
 Usage:
   python add_msat_name_v3.py -p A_welshii_Primers -c input.compare -o A_welshii_Primers.named.v3.tsv
 """
-import sys, csv, argparse, re
+import sys, argparse, gzip
+from collections import defaultdict
 from pathlib import Path
 
+_IO_BUFSIZE = 1 << 20  # 1 MiB buffers for the primer/compare tables
+_WRITE_BATCH = 10000  # output rows joined per write() call
+_COMPRESSED_SUFFIXES = (".gz", ".zst")
+
+def open_tsv(path: Path, mode: str):
+    """Open a TSV in text mode ('r' or 'w'), (de)compressing .gz/.zst by suffix."""
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", newline="")
+    if path.suffix == ".zst":
+        try:
+            import zstandard
+        except ImportError:
+            sys.exit(f"[error] {path}: .zst files require the 'zstandard' package (pip install zstandard)")
+        return zstandard.open(path, mode + "t", newline="")
+    return path.open(mode, buffering=_IO_BUFSIZE, newline="")
+
 def parse_args():
     ap = argparse.ArgumentParser(description="Insert standardized microsatellite name column into primer table (v3)")
     ap.add_argument("-p", "--primers", required=True, help="Primer table TSV from connectorToPrimer3.pl")
@@ -33,116 +51,121 @@ def parse_args():
     return ap.parse_args()
 
 def load_compare(path):
-    """Return dict: number -> (motif, rmin, rmax)"""
+    """Return dict: number -> base name "<motif>(rmin-rmax)", e.g. "TC(10-11)"."""
     comp = {}
-    with open(path, "r", newline="") as f:
-        r = csv.DictReader(f, delimiter="\t")
+    with open_tsv(path, "r") as f:
+        # Plain TSV: no quoting, so split on tabs directly
+        fieldnames = next(f, "").rstrip("\r\n").split("\t")
         needed = ["number","fasta1_motif","fasta2_motif","fasta1_repeat_number","fasta2_repeat_number"]
-        miss = [c for c in needed if c not in r.fieldnames]
+        miss = [c for c in needed if c not in fieldnames]
         if miss:
-            sys.exit(f"[error] .compare missing columns: {miss}\nHave: {r.fieldnames}")
-        for row in r:
-            num = (row.get("number") or "").strip()
+            sys.exit(f"[error] .compare missing columns: {miss}\nHave: {fieldnames}")
+        ncols = len(fieldnames)
+        num_i, m1_i, m2_i, r1_i, r2_i = (fieldnames.index(c) for c in needed)
+        for line in f:
+            row = line.rstrip("\r\n").split("\t")
+            if len(row) < ncols:
+                row += [""] * (ncols - len(row))
+            num = row[num_i].strip()
             if not num:
                 continue
-            m1 = (row.get("fasta1_motif") or "").strip().upper()
-            m2 = (row.get("fasta2_motif") or "").strip().upper()
+            m1 = row[m1_i].strip().upper()
+            m2 = row[m2_i].strip().upper()
             motif = m1 if m1 else m2
             try:
-                rep1 = int(row.get("fasta1_repeat_number", ""))
-                rep2 = int(row.get("fasta2_repeat_number", ""))
-            except Exception:
+                rep1 = int(row[r1_i])
+                rep2 = int(row[r2_i])
+            except ValueError:
                 continue
             rmin = rep1 if rep1 <= rep2 else rep2
             rmax = rep2 if rep2 >= rep1 else rep1
-            comp[num] = (motif, rmin, rmax)
+            comp[num] = f"{motif}({rmin}-{rmax})"
     if not comp:
         sys.exit("[error] No rows loaded from .compare")
     return comp
 
 def extract_locus_num(raw_id: str) -> str:
     """Extract leading integer locus number from id (e.g., '66' from '66.1' or '66.1.3')."""
-    m = re.match(r"\s*(\d+)", raw_id or "")
-    return m.group(1) if m else ""
+    s = (raw_id or "").strip()
+    # Fast path: typical ids are "<digits>" or "<digits>.<suffix>"
+    head = s.partition(".")[0]
+    if head.isdecimal():
+        return head
+    i, n = 0, len(s)
+    while i < n and s[i].isdecimal():
+        i += 1
+    return s[:i]
 
 def main():
     args = parse_args()
     in_p = Path(args.primers)
     in_c = Path(args.compare)
-    out_p = Path(args.output) if args.output else (in_p.parent / (in_p.name + ".named.v3.tsv"))
+    if args.output:
+        out_p = Path(args.output)
+    elif in_p.suffix in _COMPRESSED_SUFFIXES:
+        # primers.gz -> primers.named.v3.tsv.gz
+        out_p = in_p.parent / (in_p.stem + ".named.v3.tsv" + in_p.suffix)
+    else:
+        out_p = in_p.parent / (in_p.name + ".named.v3.tsv")
 
     comp = load_compare(in_c)
 
-    # Read primer table (tab-delimited)
-    with open(in_p, "r", newline="") as f:
-        reader = csv.reader(f, delimiter="\t")
-        rows = list(reader)
-    if not rows:
-        sys.exit("[error] Primer file appears empty")
-    header = rows[0]
-    data = rows[1:]
-
-    # Find columns
-    try:
-        id_idx = header.index("id")
-    except ValueError:
-        sys.exit(f"[error] Primer table needs an 'id' column; got: {header}")
-    if "forward_primer" not in header:
-        sys.exit(f"[error] Primer table missing 'forward_primer' column; columns: {header}")
-
-    # New header with insertion after 'id'
-    new_header = header[:id_idx+1] + ["microsatellite_name"] + header[id_idx+1:]
-
-    # Pass 1: collect loci in input order and determine their base names from .compare
-    loci_in_order = []
-    seen_loci = set()
-    locus_base = {}  # locus_num -> base_name "<motif>(R1-R2)"
-    missing_loci = set()
-
-    for row in data:
-        if len(row) < len(header):
-            row = (row + [""] * len(header))[:len(header)]
-        raw_id = (row[id_idx] or "").strip()
-        locus_num = extract_locus_num(raw_id)
-        if not locus_num:
-            continue
-        if locus_num in seen_loci:
-            continue
-        seen_loci.add(locus_num)
-        loci_in_order.append(locus_num)
-        if locus_num in comp:
-            motif, rmin, rmax = comp[locus_num]
-            locus_base[locus_num] = f"{motif}({rmin}-{rmax})"
-        else:
-            locus_base[locus_num] = "NA"
-            missing_loci.add(locus_num)
-
-    # Pass 2: assign global indices per base name, only when encountering a NEW locus with that base
-    base_counts = {}  # base_name -> next index to assign
-    locus_final = {}  # locus_num -> final name "<base>.<idx>" or "NA"
-    for locus in loci_in_order:
-        base = locus_base.get(locus, "NA")
-        if base == "NA":
-            locus_final[locus] = "NA"
-            continue
-        base_counts[base] = base_counts.get(base, 0) + 1
-        idx = base_counts[base]
-        locus_final[locus] = f"{base}.{idx}"
-
-    # Pass 3: write out rows, inserting the locus-level name for every primer row of that locus
-    out_rows = [new_header]
-    for row in data:
-        if len(row) < len(header):
-            row = (row + [""] * len(header))[:len(header)]
-        raw_id = (row[id_idx] or "").strip()
-        locus_num = extract_locus_num(raw_id)
-        ms_name = locus_final.get(locus_num, "NA")
-        new_row = row[:id_idx+1] + [ms_name] + row[id_idx+1:]
-        out_rows.append(new_row)
-
-    with open(out_p, "w", newline="") as fout:
-        w = csv.writer(fout, delimiter="\t", lineterminator="\n")
-        w.writerows(out_rows)
+    # Stream primer table (plain TSV, split on tabs); only the header is read up front
+    with open_tsv(in_p, "r") as f:
+        first = next(f, None)
+        if first is None:
+            sys.exit("[error] Primer file appears empty")
+        header = first.rstrip("\r\n").split("\t")
+
+        # Find columns
+        try:
+            id_idx = header.index("id")
+        except ValueError:
+            sys.exit(f"[error] Primer table needs an 'id' column; got: {header}")
+        if "forward_primer" not in header:
+            sys.exit(f"[error] Primer table missing 'forward_primer' column; columns: {header}")
+
+        # New header with insertion after 'id'
+        ncols = len(header)
+        name_idx = id_idx + 1
+        new_header = header[:name_idx] + ["microsatellite_name"] + header[name_idx:]
+
+        # Single pass: name each locus the first time it is seen (the numeric suffix only
+        # increments for a NEW locus sharing a base name), then write every primer row of
+        # that locus with the same name.
+        base_counts = defaultdict(int)  # base_name -> last index assigned
+        locus_final = {}  # locus_num -> final name "<base>.<idx>" or "NA"
+        missing_loci = set()
+
+        with open_tsv(out_p, "w") as fout:
+            fout.write("\t".join(new_header) + "\n")
+            batch = []  # joined output lines, written _WRITE_BATCH at a time
+            for line in f:
+                row = line.rstrip("\r\n").split("\t")
+                if len(row) < ncols:
+                    row.extend([""] * (ncols - len(row)))
+                locus_num = extract_locus_num(row[id_idx])
+                if not locus_num:
+                    ms_name = "NA"
+                elif locus_num in locus_final:
+                    ms_name = locus_final[locus_num]
+                else:
+                    base = comp.get(locus_num)
+                    if base is not None:
+                        base_counts[base] += 1
+                        idx = base_counts[base]
+                        ms_name = f"{base}.{idx}"
+                    else:
+                        ms_name = "NA"
+                        missing_loci.add(locus_num)
+                    locus_final[locus_num] = ms_name
+                row.insert(name_idx, ms_name)
+                batch.append("\t".join(row))
+                if len(batch) >= _WRITE_BATCH:
+                    fout.write("\n".join(batch) + "\n")
+                    batch.clear()
+            if batch:
+                fout.write("\n".join(batch) + "\n")
 
     # Summary
     print(f"[add_msat_name_v3] input primers : {in_p}")
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 force_tsv_extension.py
-Copy (or rename) a file to ensure it has a .tsv extension. Content is unchanged.
+Copy (or rename) a file to ensure it has a .tsv extension. Content is unchanged;
+file metadata (mode, timestamps) is not copied.
 Usage:
   python force_tsv_extension.py -i INPUT -o OUTPUT.tsv
 """
@@ -24,6 +25,6 @@ dst.parent.mkdir(parents=True, exist_ok=True)
 if args.rename:
     src.rename(dst)
 else:
-    shutil.copy2(src, dst)
+    shutil.copyfile(src, dst)  # data only; lets the kernel do the copy (sendfile on Linux)
 
 print(f"[done] {'renamed' if args.rename else 'copied'} {src} -> {dst}")
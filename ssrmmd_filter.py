@@ -22,16 +22,39 @@ Usage:
   # change thresholds if desired:
   python ssrmmd_filter.py -i input.compare -o input.filtered.compare \
       --allowed-motif-lengths 2,3,4 --min-repeats 5
+  # split a large (uncompressed) .compare across worker processes, one per CPU:
+  python ssrmmd_filter.py -i input.compare -o input.filtered.compare -j 0
 
 Notes:
   * Input must be a tab-delimited SSRMMD '.compare' with the standard column names.
   * Output preserves the **exact** header columns and order from the input.
   * Summary is printed to STDERR.
+  * Paths ending in '.gz' or '.zst' are (de)compressed on the fly ('.zst' needs the
+    'zstandard' package). The default output name keeps the input's compression.
 """
 
-import sys, csv, argparse
+import sys, os, io, argparse, gzip, multiprocessing, shutil, tempfile
+from functools import lru_cache
 from pathlib import Path
 
+_IO_BUFSIZE = 1 << 20  # 1 MiB file buffers: fewer read()/write() syscalls on large TSVs
+_COMPRESSED_SUFFIXES = (".gz", ".zst")
+_MIN_CHUNK_BYTES = 8 << 20  # smallest input slice worth handing to a worker process
+
+def open_tsv(path: Path, mode: str):
+    """Open a TSV in binary mode ('rb' or 'wb'), (de)compressing .gz/.zst by suffix."""
+    if path.suffix == ".gz":
+        return gzip.open(path, mode)
+    if path.suffix == ".zst":
+        try:
+            import zstandard
+        except ImportError:
+            sys.exit(f"[error] {path}: .zst files require the 'zstandard' package (pip install zstandard)")
+        fh = zstandard.open(path, mode)
+        # The raw decompression reader can't iterate lines; buffer it like gzip does
+        return io.BufferedReader(fh, _IO_BUFSIZE) if mode == "rb" else fh
+    return path.open(mode, buffering=_IO_BUFSIZE)
+
 def parse_args():
     p = argparse.ArgumentParser(
         description="Filter SSRMMD .compare file (preserving schema)",
@@ -45,34 +68,159 @@ def parse_args():
                    help="Minimum motif repeat count required in BOTH genomes")
     p.add_argument("--keep-at-only", action="store_true",
                    help="If set, do NOT filter out AT-only motifs. By default they are removed.")
-    return p.parse_args()
+    p.add_argument("-j", "--jobs", type=int, default=1,
+                   help="Worker processes for large uncompressed inputs (0 = one per CPU)")
+    args = p.parse_args()
+    if args.jobs < 0:
+        p.error(f"--jobs must be >= 0 (0 = one per CPU); got {args.jobs}")
+    return args
 
-def is_at_only(motif: str) -> bool:
-    s = set(motif.upper())
-    return s.issubset({"A", "T"})
+# Keyed by byte value: iterating a bytes motif yields ints
+_BASE_BITS = {ord("A"): 1, ord("C"): 2, ord("G"): 4, ord("T"): 8}
+_CG_BITS = _BASE_BITS[ord("C")] | _BASE_BITS[ord("G")]
 
-def is_valid_dna(motif: str) -> bool:
-    """Allow only unambiguous A/C/G/T."""
-    return set(motif.upper()).issubset({"A","C","G","T"})
+@lru_cache(maxsize=4096)
+def motif_bases(motif: bytes) -> int:
+    """Return a bitmask of the bases in motif (A=1, C=2, G=4, T=8); 0 if anything but A/C/G/T occurs.
 
-def to_int_or_none(x):
+    One pass answers both 'valid DNA' (non-zero) and 'AT-only' (no C/G bits).
+    Motifs are short and highly repetitive, so results are cached per motif (bounded,
+    since noisy input with wide --allowed-motif-lengths can yield many distinct strings).
+    """
+    acc = 0
+    for ch in motif:
+        bit = _BASE_BITS.get(ch)
+        if bit is None:
+            return 0
+        acc |= bit
+    return acc
+
+def to_int_or_none(x: bytes):
+    # Blank cells are common; answer them without raising/catching an exception
+    s = x.strip()
+    if not s:
+        return None
     try:
-        return int(x)
-    except Exception:
+        return int(s)
+    except ValueError:
         return None
 
+def filter_lines(lines, write, cols, allowed_lengths, min_repeats, drop_at_only):
+    """Apply the selection criteria to raw .compare data lines (bytes, header excluded).
+
+    Each kept line is passed to write() unchanged, as newline-terminated bytes.
+    cols = (ncols, poly_i, m1_i, m2_i, r1_i, r2_i). Returns (total, kept).
+    """
+    ncols, poly_i, m1_i, m2_i, r1_i, r2_i = cols
+    total = kept = 0
+    for line in lines:
+        line = line.rstrip(b"\r\n")
+        if not line:
+            continue
+        row = line.split(b"\t")
+        if len(row) < ncols:
+            row += [b""] * (ncols - len(row))
+        total += 1
+
+        # Cheapest / most selective checks first; predicates are inlined.
+        # 1) polymorphic?
+        if row[poly_i].strip().lower() != b"yes":
+            continue
+
+        # 2) motifs present and identical?
+        m1 = row[m1_i].strip().upper()
+        if not m1:
+            continue
+        if m1 != row[m2_i].strip().upper():
+            continue
+
+        # 3) motif length allowed? (default 2,3,4 -> di/tri/tetra)
+        if len(m1) not in allowed_lengths:
+            continue
+
+        # 4) valid unambiguous DNA (only A/C/G/T)?
+        bases = motif_bases(m1)
+        if not bases:
+            continue
+
+        # 5) repeat count threshold in BOTH genomes
+        r1 = to_int_or_none(row[r1_i])
+        if r1 is None or r1 < min_repeats:
+            continue
+        r2 = to_int_or_none(row[r2_i])
+        if r2 is None or r2 < min_repeats:
+            continue
+
+        # 6) avoid AT-only motifs unless user overrides
+        if drop_at_only and not bases & _CG_BITS:
+            continue
+
+        # Passed all filters -> write **unchanged** row
+        write(b"\t".join(row) + b"\n")
+        kept += 1
+    return total, kept
+
+def line_aligned_chunks(path: Path, data_start: int, n: int):
+    """Split bytes [data_start, EOF) of path into at most n (start, end) ranges beginning at line starts."""
+    size = path.stat().st_size
+    bounds = [data_start]
+    with path.open("rb") as f:
+        for k in range(1, n):
+            pos = data_start + (size - data_start) * k // n
+            f.seek(pos - 1)
+            f.readline()  # move to the start of the next line
+            pos = f.tell()
+            if bounds[-1] < pos < size:
+                bounds.append(pos)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def _filter_byte_range(job):
+    """Pool worker: filter the lines in [start, end) of the input into part_path."""
+    in_path, start, end, part_path, opts = job
+    with open(in_path, "rb", buffering=_IO_BUFSIZE) as f, \
+            open(part_path, "wb", buffering=_IO_BUFSIZE) as out:
+        f.seek(start)
+
+        def lines():
+            pos = start
+            for line in f:
+                if pos >= end:
+                    break
+                pos += len(line)
+                yield line
+
+        return filter_lines(lines(), out.write, *opts)
+
+def filter_parallel(in_path: Path, chunks, opts, fout, tmp_dir: Path):
+    """Filter each chunk in its own process, then append the parts to fout in input order."""
+    total = kept = 0
+    with tempfile.TemporaryDirectory(dir=tmp_dir, prefix=".ssrmmd_filter.") as tmp:
+        jobs = [(str(in_path), start, end, os.path.join(tmp, f"{k}.part"), opts)
+                for k, (start, end) in enumerate(chunks)]
+        with multiprocessing.Pool(len(jobs)) as pool:
+            results = pool.map(_filter_byte_range, jobs)
+        for (t, k), job in zip(results, jobs):
+            total += t
+            kept += k
+            with open(job[3], "rb") as part:
+                shutil.copyfileobj(part, fout, _IO_BUFSIZE)
+    return total, kept
+
 def main():
     args = parse_args()
     in_path = Path(args.input)
-    # Default output name keeps the .compare extension and appends '.filtered'
+    # Default output name keeps the .compare extension (and any .gz/.zst) and appends '.filtered'
     if args.output:
         out_path = Path(args.output)
     else:
-        if in_path.suffix == ".compare":
-            out_path = in_path.with_suffix("")  # drop .compare
-            out_path = out_path.with_name(out_path.name + ".filtered.compare")
+        comp_ext = in_path.suffix if in_path.suffix in _COMPRESSED_SUFFIXES else ""
+        base = in_path.with_suffix("") if comp_ext else in_path
+        if base.suffix == ".compare":
+            out_path = base.with_suffix("")  # drop .compare
+            out_path = out_path.with_name(out_path.name + ".filtered.compare" + comp_ext)
         else:
-            out_path = in_path.with_suffix(in_path.suffix + ".filtered.compare")
+            out_path = base.with_suffix(base.suffix + ".filtered.compare" + comp_ext)
 
     # Parse allowed motif lengths
     allowed_lengths = set()
@@ -84,6 +232,7 @@ def main():
             allowed_lengths.add(int(tok))
         except ValueError:
             sys.exit(f"[error] Non-integer in --allowed-motif-lengths: {tok!r}")
+    allowed_lengths = frozenset(allowed_lengths)
 
     required_cols = [
         "number",
@@ -96,61 +245,53 @@ def main():
         "polymorphism",
     ]
 
-    total = kept = 0
+    opts = (allowed_lengths, args.min_repeats, not args.keep_at_only)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    if jobs > 1 and in_path.suffix in _COMPRESSED_SUFFIXES:
+        print("[ssrmmd_filter] note: compressed input is filtered in a single process", file=sys.stderr)
+        jobs = 1
 
-    with in_path.open("r", newline="") as fin:
-        reader = csv.DictReader(fin, delimiter="\t")
+    # ASCII TSV is handled as raw bytes end to end: no decode on read, no encode on write.
+    with open_tsv(in_path, "rb") as fin:
+        # Plain TSV (no quoting/embedded tabs): split on tabs directly
+        header_line = next(fin, b"")
+        data_start = len(header_line)
+        header_line = header_line.rstrip(b"\r\n")
+        header = header_line.decode("utf-8", "replace").split("\t")
         # Validate header has at least the required columns
-        missing = [c for c in required_cols if c not in reader.fieldnames]
+        missing = [c for c in required_cols if c not in header]
         if missing:
             sys.exit(
                 "[error] Input missing required columns: %s\nFound columns: %s"
-                % (missing, reader.fieldnames)
+                % (missing, header)
             )
 
+        # Resolve column positions once; rows are handled as plain lists
+        cols = (
+            len(header),
+            header.index("polymorphism"),
+            header.index("fasta1_motif"),
+            header.index("fasta2_motif"),
+            header.index("fasta1_repeat_number"),
+            header.index("fasta2_repeat_number"),
+        )
+        opts = (cols,) + opts
+
+        # Byte-range chunks for worker processes; tiny inputs stay single-process
+        chunks = []
+        if jobs > 1:
+            data_bytes = in_path.stat().st_size - data_start
+            jobs = min(jobs, data_bytes // _MIN_CHUNK_BYTES)
+            if jobs > 1:
+                chunks = line_aligned_chunks(in_path, data_start, jobs)
+
         # Preserve **exact** input header order
-        header = list(reader.fieldnames)
-
-        with out_path.open("w", newline="") as fout:
-            writer = csv.DictWriter(fout, fieldnames=header, delimiter="\t", lineterminator="\n")
-            writer.writeheader()
-
-            for row in reader:
-                total += 1
-
-                # 1) polymorphic?
-                if (row.get("polymorphism","").strip().lower() != "yes"):
-                    continue
-
-                # 2) motifs present, identical, valid unambiguous DNA?
-                m1 = (row.get("fasta1_motif") or "").strip().upper()
-                m2 = (row.get("fasta2_motif") or "").strip().upper()
-                if not m1 or not m2:
-                    continue
-                if m1 != m2:
-                    continue
-                if not is_valid_dna(m1):
-                    continue
-
-                # 3) motif length allowed? (default 2,3,4 -> di/tri/tetra)
-                if len(m1) not in allowed_lengths:
-                    continue
-
-                # 4) repeat count threshold in BOTH genomes
-                r1 = to_int_or_none(row.get("fasta1_repeat_number",""))
-                r2 = to_int_or_none(row.get("fasta2_repeat_number",""))
-                if r1 is None or r2 is None:
-                    continue
-                if r1 < args.min_repeats or r2 < args.min_repeats:
-                    continue
-
-                # 5) avoid AT-only motifs unless user overrides
-                if not args.keep_at_only and is_at_only(m1):
-                    continue
-
-                # Passed all filters -> write **unchanged** row
-                writer.writerow(row)
-                kept += 1
+        with open_tsv(out_path, "wb") as fout:
+            fout.write(header_line + b"\n")
+            if len(chunks) > 1:
+                total, kept = filter_parallel(in_path, chunks, opts, fout, out_path.parent)
+            else:
+                total, kept = filter_lines(fin, fout.write, *opts)
 
     # Summary to STDERR
     print(f"[ssrmmd_filter] input:  {in_path}", file=sys.stderr)